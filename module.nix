@@ -60,6 +60,13 @@ in
         description = mdDoc "File containing password for Bitcoin's RPC API.";
       };
 
+      bitcoinRpcUnixSocket = mkOption {
+        type = types.nullOr types.path;
+        default = null;
+        example = "/run/bitcoind/rpc.sock";
+        description = mdDoc "UNIX socket for Bitcoin's RPC API. If set, it is used instead of host and port.";
+      };
+
       sources = {
         rpcGetconnectioncount = mkEnableOption "collecting getconnectioncount data (RPC)" // { default = true; };
         rpcGetpeerinfo = mkEnableOption "collecting getpeerinfo data (RPC)" // { default = true; };
@@ -92,6 +99,7 @@ in
       requires = [ "bitcoind.service" ];
       wants = [ "network-online.target" ];
       after = [ "network-online.target" "bitcoind.service" ];
+      path = [ pkgs.xz ]; # multi-threaded compression of large results
       serviceConfig = {
         # for now, run as root to avoid permission issues with eBPF/tracepoints
         # at some point, figure out how to address this properly (e.g.,
@@ -108,6 +116,7 @@ in
           --rpc-user=${cfg.bitcoinRpcUser} \
           ${optionalString (cfg.bitcoinRpcPass != null) "--rpc-password=${cfg.bitcoinRpcPass}" } \
           ${optionalString (cfg.bitcoinRpcPassFile != null) "--rpc-password-file=${cfg.bitcoinRpcPassFile}" } \
+          ${optionalString (cfg.bitcoinRpcUnixSocket != null) "--rpc-unix-socket=${cfg.bitcoinRpcUnixSocket}" } \
           ${if cfg.sources.rpcGetconnectioncount then "--record-rpc-getconnectioncount" else "--no-record-rpc-getconnectioncount"} \
           ${if cfg.sources.rpcGetpeerinfo then "--record-rpc-getpeerinfo" else "--no-record-rpc-getpeerinfo"} \
           ${if cfg.sources.rpcGettxoutsetinfo then "--record-rpc-gettxoutsetinfo" else "--no-record-rpc-gettxoutsetinfo"} \
@@ -0,0 +1,103 @@
+"""Base class for sources writing to daily CSV files."""
+
+import asyncio
+import csv
+import logging as log
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import IO, ClassVar
+
+from ..util import human_readable_time
+
+
+@dataclass
+class DailyCSVSource:
+    """
+    Base class containing shared functionality of sources that collect data
+    every FREQUENCY seconds and append it to one CSV file per day.
+    """
+
+    results_path: Path
+    RESULTS_DIR: ClassVar[str] = "dummy"  # sub-directory of results_path
+    CALL_NAME: ClassVar[str] = "dummy"
+    FREQUENCY: ClassVar[int] = 5  # default polling frequency [s]
+    CSV_FIELDS: ClassVar[list[str]] = ["dummy"]
+    _csv_date: str | None = field(default=None, init=False, repr=False)
+    _csv_file: IO | None = field(default=None, init=False, repr=False)
+    # most recent write handed to a worker thread
+    _write: asyncio.Future | None = field(default=None, init=False, repr=False)
+
+    @cached_property
+    def log(self):
+        """Custom logger."""
+        return log.getLogger(self.__class__.__name__)
+
+    @cached_property
+    def csv_dir(self) -> Path:
+        """Directory for the daily CSV files (created on first use)."""
+        path = self.results_path / self.RESULTS_DIR / self.CALL_NAME
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    async def reschedule(self):
+        """Reschedule the task by sleeping until the next multiple of FREQUENCY."""
+        now = time.time()
+        next_scheduled = now - now % self.FREQUENCY + self.FREQUENCY
+        sleep_time = next_scheduled - now
+        if self.log.isEnabledFor(log.INFO):
+            self.log.info(
+                "Scheduling next run at %s (sleeping for %s)",
+                time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(next_scheduled)),
+                human_readable_time(sleep_time),
+            )
+        await asyncio.sleep(sleep_time)
+        # the event loop may wake up a little early, which would stamp the next
+        # run with the previous second; sleep off the remainder (rather than
+        # busy-waiting, which would stall every other source on the loop)
+        while (remaining := next_scheduled - time.time()) > 0:
+            await asyncio.sleep(remaining)
+        self.log.info("Waking up")
+
+    async def write_in_thread(self, *args):
+        """Call write_result(*args) in a worker thread.
+
+        The thread cannot be cancelled, so neither is waiting for it: the write
+        is shielded and kept track of, so that close_after_write() can wait for
+        it to finish before closing its file.
+        """
+        self._write = asyncio.ensure_future(asyncio.to_thread(self.write_result, *args))
+        await asyncio.shield(self._write)
+
+    async def close_after_write(self):
+        """Wait for a write still running in a worker thread, then close."""
+        if self._write is not None and not self._write.done():
+            self.log.info("waiting for running write")
+            await asyncio.gather(asyncio.shield(self._write), return_exceptions=True)
+        self.close()
+
+    def csv_file(self, date: str) -> IO:
+        """Return the CSV file for date.
+
+        The daily file is kept open until the date changes, at which point it
+        is closed and the next day's file is opened.
+        """
+        if date != self._csv_date:
+            self.close()
+            self._csv_file = self.open_csv(self.csv_dir / f"{date}.csv")
+            self._csv_date = date
+        return self._csv_file
+
+    def open_csv(self, file: Path) -> IO:
+        """Open file for appending, writing the header if the file is new."""
+        f = open(file, "a", newline="", encoding="UTF-8")
+        if f.tell() == 0:  # new (or empty) file
+            csv.writer(f).writerow(["timestamp"] + self.CSV_FIELDS)
+        return f
+
+    def close(self):
+        """Close the current CSV file, if one is open."""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_date = self._csv_file = None
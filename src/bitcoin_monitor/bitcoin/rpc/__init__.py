@@ -1,6 +1,8 @@
 from .base import BitcoinRPCBase
+from .client import RPCClient
 from .getconnectioncount import GetConnectionCount
 from .getnodeaddresses import GetNodeAddresses
 from .getpeerinfo import GetPeerInfo
 from .getrawaddrman import GetRawAddrman
 from .gettxoutsetinfo import GetTxoutSetInfo
+from .scheduler import RPCScheduler
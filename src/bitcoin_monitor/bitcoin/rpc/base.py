@@ -1,139 +1,188 @@
 """Base class for Bitcoin RPC API calls."""
 
 import asyncio
+import contextlib
 import csv
-import datetime
+import io
+import json
 import logging as log
+import lzma
+import shutil
+import subprocess
 import time
-from dataclasses import dataclass
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 from functools import cached_property
 from pathlib import Path
-from typing import ClassVar
+from typing import Any, ClassVar, TextIO
 
 import aiohttp
 
-from ...config import RPCConfig
-
-
-def human_readable_size(size_bytes: int) -> str:
-    """Convert size in bytes to a human-readable string."""
-    if size_bytes < 1000:
-        return f"{size_bytes}B"
-    if (size_kbytes := size_bytes / 1000) < 1000:
-        return f"{size_kbytes:.1f}kB"
-    return f"{(size_kbytes/1000):.1f}MB"
-
-
-def human_readable_time(sec: float) -> str:
-    """Convert seconds to a human-readable string."""
-    if (msec := int(sec * 1000)) < 1000:
-        return f"{msec}ms"
-    if sec < 60:
-        return f"{sec:.1f}s"
-    if (min_ := sec / 60) < 60:
-        return f"{min_:.1f}m"
-    return f"{(min_/60):.1f}h"
+from ...util import human_readable_size, human_readable_time, utc_timestamp
+from .client import RPCClient
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@contextlib.contextmanager
+def xz_open(file: Path) -> Iterator[TextIO]:
+    """Open file for writing xz-compressed text.
+
+    Compression is done by a multi-threaded xz process if the binary is
+    available; otherwise, fall back to the single-threaded lzma module.
+    """
+    if (xz := shutil.which("xz")) is None:
+        with lzma.open(file, "wt", encoding="UTF-8") as f:
+            yield f
+        return
+
+    with open(file, "wb") as out:
+        with subprocess.Popen(
+            [xz, "--threads=0", "--stdout"], stdin=subprocess.PIPE, stdout=out
+        ) as proc:
+            with io.TextIOWrapper(proc.stdin, encoding="UTF-8") as f:
+                yield f
+    if proc.returncode != 0:
+        raise OSError(f"xz exited with status {proc.returncode} for {file}")
+
+
+async def rpc_post(client: RPCClient, body: bytes, logger: log.Logger) -> Any:
+    """Send an encoded JSON-RPC request (or batch of requests) to Bitcoin Core
+    and return the decoded response."""
+
+    time_start = time.time()
+    try:
+        async with client.session.post(
+            client.url, data=body, headers=JSON_HEADERS
+        ) as response:
+            if response.status == 200:
+                # measure the body actually read: chunked responses lack
+                # Content-Length
+                body = await response.read()
+            else:
+                raise ConnectionError(
+                    "unexpected RPC response: "
+                    f"status={response.status}, reason={response.reason}"
+                )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # e.g., bitcoind not running or not responding
+        raise ConnectionError(f"RPC request failed: {e!r}") from e
+    if logger.isEnabledFor(log.INFO):
+        logger.info(
+            "API response: status=%s, reason=%s, size=%s, call_duration=%s",
+            response.status,
+            response.reason,
+            human_readable_size(len(body)),
+            human_readable_time(time.time() - time_start),
+        )
+    # parse raw bytes directly instead of decoding to str first
+    return json.loads(body)
 
 
 @dataclass
 class BitcoinRPCBase:
     """Base class containing shared functionality related to Bitcoin Core's RPC API."""
 
-    conf: RPCConfig
+    client: RPCClient
     results_path: Path
     CALL_NAME: ClassVar[str] = "dummy"
     CALL_ARGUMENTS: ClassVar[list] = []
     FREQUENCY: ClassVar[int] = 60 * 60  # default polling frequency [s]
     CSV_FIELDS: ClassVar[list[str]] = ["dummy"]
+    BATCHABLE: ClassVar[bool] = True  # may share a JSON-RPC batch with other calls
+    _csv_file: TextIO | None = field(default=None, init=False, repr=False)
+    _csv_writer: Any = field(default=None, init=False, repr=False)
 
     @cached_property
     def log(self):
         """Custom logger."""
         return log.getLogger(self.__class__.__name__)
 
-    async def reschedule(self):
-        """Reschedule the task by sleeping until the next multiple of FREQUENCY."""
-        now = time.time() + 1  # avoid race condition where now % FREQUENCY == 0
-        last_scheduled = now - now % self.FREQUENCY
-        next_scheduled = last_scheduled + self.FREQUENCY
-        wake_time = datetime.datetime.utcfromtimestamp(next_scheduled)
-        sleep_time = next_scheduled - now
-        self.log.info(
-            "Scheduling next run at %s (sleeping for %s)",
-            wake_time.isoformat() + "Z",
-            human_readable_time(sleep_time),
-        )
-        await asyncio.sleep(sleep_time)
-        self.log.info("Waking up")
-
-    async def run(self):
-        """Code to fetch data from Bitcoin API."""
-        self.log.info(
-            "BitcoinRPCBase:run() started for call=%s, arguments=%s",
-            self.CALL_NAME,
-            ",".join(str(arg) for arg in self.CALL_ARGUMENTS)
-            if self.CALL_ARGUMENTS
-            else "None",
-        )
-
-        while True:
-            call_time = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
-            try:
-                call_result = await self.rpc_call()
-                data = self.format_results(call_time, call_result)
-                if not data:
-                    self.log.warning("no data returned by format_results")
-                    break
-                self.write_result(data)
-            except ConnectionError as e:
-                self.log.error(e)
-            await self.reschedule()
-
-    async def rpc_call(self):
-        """Open RPC connection, perform RPC calls, and write results."""
-
-        rpc_url = f"http://{self.conf.user}:{self.conf.password}@{self.conf.host}:{self.conf.port}/"
-        rpc_data = {
+    @cached_property
+    def rpc_request(self) -> dict:
+        """JSON-RPC request object. The call name doubles as request ID, so
+        responses to batched requests can be routed back to their source."""
+        return {
             "method": self.CALL_NAME,
             "params": self.CALL_ARGUMENTS,
             "jsonrpc": "2.0",
-            "id": 1,
+            "id": self.CALL_NAME,
         }
+
+    @cached_property
+    def rpc_body(self) -> bytes:
+        """Encoded JSON-RPC request. Since call name and arguments are class
+        variables, the request never changes and is only encoded once."""
+        return json.dumps(self.rpc_request).encode()
+
+    async def poll_once(self) -> bool:
+        """Fetch data from Bitcoin API once and write the results.
+
+        Returns False if no data was returned, in which case the source should
+        not be polled again.
+        """
+        call_time = utc_timestamp()
+        try:
+            call_result = await self.rpc_call()
+        except ConnectionError as e:
+            self.log.error(e)
+            return True
+        return await self.handle_result(call_time, call_result)
+
+    async def rpc_call(self):
+        """Open RPC connection, perform RPC call, and return its result."""
         self.log.info("Initiating %s RPC call", self.CALL_NAME)
-        time_start = time.time()
-        async with aiohttp.ClientSession() as session:
-            async with session.post(rpc_url, json=rpc_data) as response:
-                if response.status == 200:
-                    result = await response.json()
-                else:
-                    raise ConnectionError(
-                        f"unexpected RPC response: status={response.status}, reason={response.reason}"
-                    )
-        call_duration = time.time() - time_start
-        self.log.info(
-            "API response: status=%s, reason=%s, size=%s, call_duration=%s",
-            response.status,
-            response.reason,
-            human_readable_size(int(response.headers["Content-Length"])),
-            human_readable_time(call_duration),
-        )
-        return result["result"]
+        response = await rpc_post(self.client, self.rpc_body, self.log)
+        return self.unpack_response(response)
+
+    def unpack_response(self, response: dict):
+        """Extract the call result from a JSON-RPC response object."""
+        if response.get("error"):
+            raise ConnectionError(f"{self.CALL_NAME} failed: {response['error']}")
+        return response["result"]
 
-    def format_results(self, timestamp, data) -> list[dict]:
-        """Format results obtained via API call. Since this is call-specific,
-        the appropriate code resides in subclasses."""
+    async def handle_result(self, call_time: str, call_result) -> bool:
+        """Format and write the result of a call.
+
+        Returns False if no data was returned, in which case the source should
+        not be polled again.
+        """
+        data = self.format_results(call_time, call_result)
+        if not data:
+            self.log.warning("no data returned by format_results")
+            return False
+        # write in a worker thread so compressing large dumps does not block the
+        # event loop (and thus all other sources)
+        await asyncio.to_thread(self.write_result, data)
+        return True
+
+    def format_results(self, timestamp, data) -> list[tuple]:
+        """Format results obtained via API call into rows ordered like
+        ["timestamp"] + CSV_FIELDS. Since this is call-specific, the
+        appropriate code resides in subclasses."""
         raise NotImplementedError("Needs to be overwritten in subclass!")
 
     def write_result(self, data):
         """Write CSV call results to CSV file.
 
-        :param list data: a list of dicts containing data to be written
+        The file is opened on first use and kept open across calls; it is
+        flushed after each write so no results are lost if the process dies.
+
+        :param list data: a list of tuples containing rows to be written
         """
 
-        file = Path(f"{self.results_path}/{self.CALL_NAME}.csv")
-        file_exists = file.exists()
-        with open(file, "a", newline="", encoding="UTF-8") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=["timestamp"] + self.CSV_FIELDS)
-            if not file_exists:
-                csv_writer.writeheader()
-            csv_writer.writerows(data)
+        if self._csv_file is None:
+            file = self.results_path / f"{self.CALL_NAME}.csv"
+            self._csv_file = open(file, "a", newline="", encoding="UTF-8")
+            self._csv_writer = csv.writer(self._csv_file)
+            if self._csv_file.tell() == 0:  # new (or empty) file
+                self._csv_writer.writerow(["timestamp"] + self.CSV_FIELDS)
+
+        self._csv_writer.writerows(data)
+        self._csv_file.flush()
+
+    def close(self):
+        """Close the CSV file, if it was opened."""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = self._csv_writer = None
@@ -13,10 +13,10 @@ class GetConnectionCount(BitcoinRPCBase):
     CALL_NAME: ClassVar[str] = "getconnectioncount"
     CSV_FIELDS: ClassVar[list[str]] = ["connectioncount"]
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    def format_results(self, timestamp, data) -> list[tuple]:
         """
         Format RPC call result.
 
         The RPC call result is a scalar integer: Nothing to do.
         """
-        return [{"timestamp": timestamp, "connectioncount": data}]
+        return [(timestamp, data)]
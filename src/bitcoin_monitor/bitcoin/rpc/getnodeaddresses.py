@@ -2,12 +2,12 @@
 
 import csv
 import logging as log
-import lzma
 from dataclasses import dataclass
 from pathlib import Path
 from typing import ClassVar
 
 from . import BitcoinRPCBase
+from .base import xz_open
 
 
 @dataclass
@@ -19,25 +19,23 @@ class GetNodeAddresses(BitcoinRPCBase):
     CSV_FIELDS: ClassVar[list[str]] = ["time", "services", "address", "port", "network"]
     FREQUENCY: ClassVar[int] = 60 * 60  # every hour
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    def format_results(self, timestamp, data) -> list[tuple]:
         """
         Format RPC call result.
 
-        The RPC call result is a list of detailed address data entries.
+        The RPC call result is a list of detailed address data entries, which
+        are converted to rows ordered like CSV_FIELDS. Fields not reported by
+        the node (e.g., network before v22) are None, which csv writes as
+        empty values.
         """
 
-        results = []
-        for addr in data:
-            result = {"timestamp": timestamp}
-            result.update({key: addr[key] for key in self.CSV_FIELDS if key in addr})
-            results.append(result)
-
-        return results
+        fields = tuple(self.CSV_FIELDS)
+        return [(timestamp, *map(addr.get, fields)) for addr in data]
 
     def write_result(self, data):
         """Custom write result method."""
 
-        timestamp_str = data[0]["timestamp"]
+        timestamp_str = data[0][0]
         file = Path(f"{self.results_path}/{self.CALL_NAME}/{timestamp_str}.csv.xz")
 
         if file.exists():
@@ -45,7 +43,7 @@ class GetNodeAddresses(BitcoinRPCBase):
             return
 
         file.parent.mkdir(parents=True, exist_ok=True)
-        with lzma.open(file, "wt") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=["timestamp"] + self.CSV_FIELDS)
-            csv_writer.writeheader()
+        with xz_open(file) as f:
+            csv_writer = csv.writer(f)
+            csv_writer.writerow(["timestamp"] + self.CSV_FIELDS)
             csv_writer.writerows(data)
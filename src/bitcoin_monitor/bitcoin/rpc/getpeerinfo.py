@@ -26,16 +26,13 @@ class GetPeerInfo(BitcoinRPCBase):
         "connection_type",
     ]
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    def format_results(self, timestamp, data) -> list[tuple]:
         """
         Format RPC call result.
 
         The RPC call result is a list of dictionaries: Iterate over list
-        entries and extract relevant data from dict.
+        entries and extract relevant data from dict into a row. Fields not
+        reported by the node are None, which csv writes as empty values.
         """
-        results = []
-        for peer in data:
-            result = {"timestamp": timestamp}
-            result.update({key: peer[key] for key in self.CSV_FIELDS if key in peer})
-            results.append(result)
-        return results
+        fields = tuple(self.CSV_FIELDS)
+        return [(timestamp, *map(peer.get, fields)) for peer in data]
@@ -1,13 +1,16 @@
 """Bitcoin Core RPC API implementation."""
 
+import asyncio
 import csv
+import itertools
 import logging as log
-import lzma
+from collections.abc import Iterator
 from dataclasses import dataclass
 from pathlib import Path
 from typing import ClassVar
 
 from . import BitcoinRPCBase
+from .base import xz_open
 
 
 @dataclass
@@ -26,29 +29,44 @@ class GetRawAddrman(BitcoinRPCBase):
     ]
     FREQUENCY: ClassVar[int] = 24 * 60 * 60  # every day
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    async def handle_result(self, call_time: str, call_result) -> bool:
+        """Format and write the result of a call.
+
+        Overrides the base implementation because format_results returns a
+        generator here, which is always truthy: whether the node returned any
+        addresses is checked on the call result instead. As for every other
+        source, False is returned if there are none, so the source is no longer
+        polled.
+        """
+        if not any(call_result["cache"].values()):
+            self.log.warning("no addresses returned by %s", self.CALL_NAME)
+            return False
+        rows = self.format_results(call_time, call_result)
+        await asyncio.to_thread(self.write_result, rows)
+        return True
+
+    def format_results(self, timestamp, data) -> Iterator[tuple]:
         """
         Format RPC call result.
 
-        The RPC call result is a list of detailed address data entries.
+        The RPC call result is a list of detailed address data entries. Since
+        addrman dumps are large, rows are generated lazily and streamed into
+        the output file instead of being collected in a list first. Fields
+        not reported by the node are None, which csv writes as empty values.
         """
 
-        results = []
+        fields = tuple(self.CSV_FIELDS[1:])  # skip cache_id
         caches = data["cache"]
         for cache_id, addrs in caches.items():
             for addr in addrs:
-                result = {"timestamp": timestamp, "cache_id": cache_id}
-                result.update(
-                    {key: addr[key] for key in self.CSV_FIELDS if key in addr}
-                )
-                results.append(result)
-
-        return results
+                yield (timestamp, cache_id, *map(addr.get, fields))
 
     def write_result(self, data):
         """Custom write result method."""
 
-        timestamp_str = data[0]["timestamp"]
+        rows = iter(data)
+        first = next(rows)  # handle_result only writes non-empty results
+        timestamp_str = first[0]
         file = Path(f"{self.results_path}/{self.CALL_NAME}/{timestamp_str}.csv.xz")
 
         if file.exists():
@@ -56,7 +74,7 @@ class GetRawAddrman(BitcoinRPCBase):
             return
 
         file.parent.mkdir(parents=True, exist_ok=True)
-        with lzma.open(file, "wt") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=["timestamp"] + self.CSV_FIELDS)
-            csv_writer.writeheader()
-            csv_writer.writerows(data)
+        with xz_open(file) as f:
+            csv_writer = csv.writer(f)
+            csv_writer.writerow(["timestamp"] + self.CSV_FIELDS)
+            csv_writer.writerows(itertools.chain([first], rows))
@@ -12,6 +12,8 @@ class GetTxoutSetInfo(BitcoinRPCBase):
 
     # 'gettxoutsetinfo' takes ~3m to execute on contabo, so schedule only daily
     FREQUENCY: ClassVar[int] = 24 * 60 * 60
+    # bitcoind handles batches sequentially, so don't hold up other calls
+    BATCHABLE: ClassVar[bool] = False
     CALL_NAME: ClassVar[str] = "gettxoutsetinfo"
     CSV_FIELDS: ClassVar[list[str]] = [
         "height",
@@ -24,13 +26,12 @@ class GetTxoutSetInfo(BitcoinRPCBase):
         "disk_size",
     ]
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    def format_results(self, timestamp, data) -> list[tuple]:
         """
         Format RPC call result.
 
-        The RPC call result is a scalar integer: Nothing to do.
+        The RPC call result is a dictionary: Extract relevant data into a
+        single row. Fields not reported by the node are left empty.
         """
 
-        result = {"timestamp": timestamp}
-        result.update({key: data[key] for key in self.CSV_FIELDS if key in data})
-        return [result]
+        return [(timestamp, *(data.get(key, "") for key in self.CSV_FIELDS))]
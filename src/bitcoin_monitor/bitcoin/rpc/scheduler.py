@@ -0,0 +1,152 @@
+"""Scheduler for Bitcoin RPC API calls."""
+
+import asyncio
+import logging as log
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from ...util import human_readable_time, utc_timestamp
+from .base import BitcoinRPCBase, rpc_post
+from .client import RPCClient
+
+
+@dataclass
+class RPCScheduler:
+    """
+    Drive all RPC sources from a single loop.
+
+    Polling frequencies are multiples of each other, so sources tend to become
+    due at the same time. Instead of running one sleeping task per source, the
+    scheduler sleeps until the earliest due time and then dispatches every
+    source that is due. Polls run as separate tasks so that a slow call (e.g.,
+    gettxoutsetinfo) does not delay the others. Calls that become due together
+    are sent as a single JSON-RPC batch request.
+    """
+
+    client: RPCClient
+    sources: list[BitcoinRPCBase]
+    # next due time and most recent poll task of each source, keyed by call name
+    next_due: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    tasks: dict[str, asyncio.Task] = field(default_factory=dict, init=False, repr=False)
+
+    @cached_property
+    def log(self):
+        """Custom logger."""
+        return log.getLogger(self.__class__.__name__)
+
+    def dispatch(self, now: float):
+        """Start polls of all due sources and compute their next due times."""
+        batch = []
+        for source in self.sources:
+            name = source.CALL_NAME
+            if name not in self.next_due or self.next_due[name] > now:
+                continue
+            if (task := self.tasks.get(name)) is not None and not task.done():
+                self.log.warning("previous %s call still running, skipping", name)
+            elif source.BATCHABLE:
+                batch.append(source)
+            else:
+                self.tasks[name] = asyncio.create_task(self.poll(source))
+            self.next_due[name] = now - now % source.FREQUENCY + source.FREQUENCY
+
+        if len(batch) == 1:
+            self.tasks[batch[0].CALL_NAME] = asyncio.create_task(self.poll(batch[0]))
+        elif batch:
+            task = asyncio.create_task(self.poll_batch(batch))
+            self.tasks.update((source.CALL_NAME, task) for source in batch)
+
+    def stop(self, source: BitcoinRPCBase):
+        """Stop scheduling the source."""
+        self.log.warning("no longer polling %s", source.CALL_NAME)
+        self.next_due.pop(source.CALL_NAME, None)
+
+    async def poll(self, source: BitcoinRPCBase):
+        """Poll a single source and stop scheduling it if it returned no data."""
+        try:
+            if not await source.poll_once():
+                self.stop(source)
+        except Exception:
+            # polls run as tasks nobody awaits, so report errors right away
+            source.log.exception("%s call failed", source.CALL_NAME)
+
+    async def poll_batch(self, sources: list[BitcoinRPCBase]):
+        """Poll several sources using a single JSON-RPC batch request."""
+        try:
+            await self._poll_batch(sources)
+        except Exception:
+            # polls run as tasks nobody awaits, so report errors right away
+            self.log.exception(
+                "batched call failed: %s", ",".join(s.CALL_NAME for s in sources)
+            )
+
+    async def _poll_batch(self, sources: list[BitcoinRPCBase]):
+        """Send the batch request and hand each response to its source."""
+        call_time = utc_timestamp()
+        names = [source.CALL_NAME for source in sources]
+        self.log.info("Initiating batched RPC calls: %s", ",".join(names))
+        body = b"[" + b",".join(source.rpc_body for source in sources) + b"]"
+        try:
+            responses = await rpc_post(self.client, body, self.log)
+        except ConnectionError as e:
+            self.log.error(e)
+            return
+
+        if not isinstance(responses, list):
+            # e.g., a single error object if bitcoind rejected the whole batch
+            self.log.error("unexpected response to batched call: %.200r", responses)
+            return
+
+        # the order of responses is unspecified, so route them by request ID
+        by_id = {
+            response.get("id"): response
+            for response in responses
+            if isinstance(response, dict)
+        }
+        for source in sources:
+            if (response := by_id.get(source.CALL_NAME)) is None:
+                source.log.error("no response to batched %s call", source.CALL_NAME)
+                continue
+            # handle each source separately, so that one failing source does not
+            # cost the others in the batch their results
+            try:
+                call_result = source.unpack_response(response)
+                if not await source.handle_result(call_time, call_result):
+                    self.stop(source)
+            except ConnectionError as e:
+                source.log.error(e)
+            except Exception:
+                source.log.exception("batched %s call failed", source.CALL_NAME)
+
+    async def run(self):
+        """Code to fetch data from Bitcoin API."""
+        self.log.info(
+            "RPCScheduler:run() started for calls=%s",
+            ",".join(source.CALL_NAME for source in self.sources),
+        )
+
+        now = time.time()
+        self.next_due = {source.CALL_NAME: now for source in self.sources}
+        try:
+            while self.next_due:
+                self.dispatch(time.time())
+                if not self.next_due:
+                    break
+                next_run = min(self.next_due.values())
+                sleep_time = max(0.0, next_run - time.time())
+                if self.log.isEnabledFor(log.INFO):
+                    self.log.info(
+                        "Scheduling next run at %s (sleeping for %s)",
+                        time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(next_run)),
+                        human_readable_time(sleep_time),
+                    )
+                await asyncio.sleep(sleep_time)
+        finally:
+            # let running polls finish (bounded by the HTTP session's timeout)
+            # rather than cancelling them: a write already handed to a worker
+            # thread would keep going and race with closing its file below
+            if pending := {task for task in self.tasks.values() if not task.done()}:
+                self.log.info("waiting for %d running call(s)", len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+            for source in self.sources:
+                source.close()
@@ -2,48 +2,21 @@
 
 import asyncio
 import csv
-import datetime
-import logging as log
-import subprocess
-import time
 from dataclasses import dataclass
-from functools import cached_property
-from pathlib import Path
 from typing import ClassVar
 
-
-# TODO: This is taken from ../rpc/base.py; at some point, extract this
-# functionality to avoid duplication
-def human_readable_size(size_bytes: int) -> str:
-    """Convert size in bytes to a human-readable string."""
-    if size_bytes < 1000:
-        return f"{size_bytes}B"
-    if (size_kbytes := size_bytes / 1000) < 1000:
-        return f"{size_kbytes:.1f}kB"
-    return f"{(size_kbytes/1000):.1f}MB"
-
-
-# TODO: This is taken from ../rpc/base.py; at some point, extract this
-# functionality to avoid duplication
-def human_readable_time(sec: float) -> str:
-    """Convert seconds to a human-readable string."""
-    if (msec := int(sec * 1000)) < 1000:
-        return f"{msec}ms"
-    if sec < 60:
-        return f"{sec:.1f}s"
-    if (min_ := sec / 60) < 60:
-        return f"{min_:.1f}m"
-    return f"{(min_/60):.1f}h"
+from ...util import utc_timestamp
+from ..base import DailyCSVSource
 
 
 @dataclass
-class IPAccounting:
+class IPAccounting(DailyCSVSource):
     """
     Class implementing the collection of IP accounting statistics for the
     bitcoind service via systemd.
     """
 
-    results_path: Path
+    RESULTS_DIR: ClassVar[str] = "systemd"
     FREQUENCY: ClassVar[int] = 5  # 5 seconds
     CALL_NAME: ClassVar[str] = "ip_accounting"
     CSV_FIELDS: ClassVar[list[str]] = [
@@ -53,109 +26,84 @@ class IPAccounting:
         "IPEgressBytes",
     ]
 
-    # TODO: This is taken from ../rpc/base.py; at some point, extract this
-    # functionality to avoid duplication
-    @cached_property
-    def log(self):
-        """Custom logger."""
-        return log.getLogger(self.__class__.__name__)
-
-    # TODO: This is taken from ../rpc/base.py; at some point, extract this
-    # functionality to avoid duplication
-    async def reschedule(self):
-        """Reschedule the task by sleeping until the next multiple of FREQUENCY."""
-        now = time.time() + 1  # avoid race condition where now % FREQUENCY == 0
-        last_scheduled = now - now % self.FREQUENCY
-        next_scheduled = last_scheduled + self.FREQUENCY
-        wake_time = datetime.datetime.utcfromtimestamp(next_scheduled)
-        sleep_time = next_scheduled - now
-        self.log.info(
-            "Scheduling next run at %s (sleeping for %s)",
-            wake_time.isoformat() + "Z",
-            human_readable_time(sleep_time),
-        )
-        await asyncio.sleep(sleep_time)
-        self.log.info("Waking up")
-
     async def run(self):
         """Code to fetch data from systemd."""
         self.log.info("systemd.IPAccounting:run() started")
 
-        tz = datetime.timezone.utc
-        while True:
-            call_time = datetime.datetime.now(tz).strftime("%Y-%m-%dT%H:%M:%SZ")
-            try:
-                call_result = await self.systemd_call()
-                data = self.format_results(call_time, call_result)
-                if not data:
-                    self.log.warning("no data returned by format_results")
-                    break
-                self.write_result(data)
-            except ConnectionError as e:
-                self.log.error(e)
-            await self.reschedule()
+        try:
+            while True:
+                call_time = utc_timestamp()
+                try:
+                    call_result = await self.systemd_call()
+                    data = self.format_results(call_time, call_result)
+                    if not data:
+                        self.log.warning("no data returned by format_results")
+                        break
+                    await self.write_in_thread(data)
+                except ConnectionError as e:
+                    self.log.error(e)
+                await self.reschedule()
+        finally:
+            await self.close_after_write()
 
     async def systemd_call(self, service_name="bitcoind.service") -> dict:
-        try:
-            result = subprocess.run(
-                [
-                    "systemctl",
-                    "show",
-                    service_name,
-                    "-p",
-                    "IPIngressBytes",
-                    "-p",
-                    "IPIngressPackets",
-                    "-p",
-                    "IPEgressBytes",
-                    "-p",
-                    "IPEgressPackets",
-                    "-p",
-                    "IPAccounting",
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True,
+        """Query the service's IP accounting counters from systemd.
+
+        systemd keeps these counters in BPF maps attached to the service's
+        cgroup; there is no cgroupfs file to read them from, so they have to be
+        obtained via systemd. systemctl is run as an asyncio subprocess so that
+        waiting for it does not block the event loop.
+        """
+        proc = await asyncio.create_subprocess_exec(
+            "systemctl",
+            "show",
+            service_name,
+            "-p",
+            "IPIngressBytes",
+            "-p",
+            "IPIngressPackets",
+            "-p",
+            "IPEgressBytes",
+            "-p",
+            "IPEgressPackets",
+            "-p",
+            "IPAccounting",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            self.log.error(
+                "systemctl show %s failed: %s", service_name, stderr.decode().strip()
             )
-        except subprocess.CalledProcessError as e:
-            print(f"Error: {e.stderr.strip()}")
             return {}
 
-        data = {}
-        for line in result.stdout.strip().split("\n"):
-            if "=" in line:
-                key, value = line.strip().split("=", 1)
-                data[key] = value
+        data = dict(
+            line.split("=", 1) for line in stdout.decode().splitlines() if "=" in line
+        )
 
         if data.get("IPAccounting", "no") != "yes":
-            print(f"IP Accounting is not enabled for '{service_name}'.")
+            self.log.warning("IP accounting is not enabled for %s", service_name)
             return {}
 
         return data
 
-    def format_results(self, timestamp, data) -> list[dict]:
+    def format_results(self, timestamp, data) -> list[tuple]:
         """
-        Format call results: just add timestamp.
+        Format call results: a single row with the timestamp and the counters
+        in CSV_FIELDS order.
         """
-        return [
-            {"timestamp": timestamp}
-            | {k: v for k, v in data.items() if k in self.CSV_FIELDS}
-        ]
+        return [(timestamp, *(data.get(key, "") for key in self.CSV_FIELDS))]
 
     def write_result(self, data):
         """Write CSV call results to CSV file.
 
-        :param list data: a list of dicts containing data to be written
-        """
+        The daily file is flushed after each write so no results are lost if
+        the process dies.
 
-        date = data[0]["timestamp"].split("T")[0]
-        file = Path(f"{self.results_path}/systemd/{self.CALL_NAME}/{date}.csv")
+        :param list data: a list of tuples containing rows to be written
+        """
 
-        file_exists = file.exists()
-        file.parent.mkdir(parents=True, exist_ok=True)
-        with open(file, "a", newline="", encoding="UTF-8") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=["timestamp"] + self.CSV_FIELDS)
-            if not file_exists:
-                csv_writer.writeheader()
-            csv_writer.writerows(data)
+        csv_file = self.csv_file(data[0][0][:10])  # YYYY-MM-DD
+        csv.writer(csv_file).writerows(data)
+        csv_file.flush()
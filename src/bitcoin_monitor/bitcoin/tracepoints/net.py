@@ -1,30 +1,29 @@
-"""Log ip accounting data for bitcoind."""
+"""Log bitcoind's P2P messages via its net tracepoints."""
 
 import asyncio
 import csv
-import datetime
-import logging as log
-import time
-from dataclasses import asdict, dataclass
-from functools import cached_property
+import io
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import ClassVar
+from typing import BinaryIO, ClassVar
 
-import psutil
 from bcc import BPF, USDT
 
+from ...util import utc_timestamp
+from ..base import DailyCSVSource
 
-@dataclass
-class Message:
-    """A P2P network message."""
 
-    peer_id: int
-    peer_conn_type: str
-    peer_addr: str
-    flow: str
-    msg_type: str
-    size: int
+# message flow as reported by the BPF program (FLOW_INBOUND, FLOW_OUTBOUND)
+FLOWS = (b"in", b"out")
 
+# CSV row for a message: timestamp, then the fields in Net.CSV_FIELDS order
+# (line terminator as used by the csv module)
+ROW_FORMAT = b"%s,%d,%s,%s,%s,%s,%d\r\n"
+# characters that require a field to be quoted; commas are checked separately
+NEEDS_QUOTING = re.compile(rb'["\r\n]')
 
 PROGRAM = """
 #include <uapi/linux/ptrace.h>
@@ -35,6 +34,9 @@ PROGRAM = """
 #define MAX_PEER_CONN_TYPE_LENGTH 20
 #define MAX_MSG_TYPE_LENGTH 20
 
+#define FLOW_INBOUND 0
+#define FLOW_OUTBOUND 1
+
 struct p2p_message
 {
     u64     peer_id;
@@ -42,78 +44,80 @@ struct p2p_message
     char    peer_conn_type[MAX_PEER_CONN_TYPE_LENGTH];
     char    msg_type[MAX_MSG_TYPE_LENGTH];
     u64     msg_size;
+    u8      flow;
 };
 
 
-// Two BPF perf buffers for pushing data (here P2P messages) to user space.
-BPF_PERF_OUTPUT(inbound_messages);
-BPF_PERF_OUTPUT(outbound_messages);
+// A single BPF ring buffer (shared by all CPUs, requires kernel >= 5.8) for
+// pushing data (here P2P messages) to user space. Since it is only drained
+// every few seconds, be generous with the size (in pages, must be a power of 2):
+// 8 MiB hold roughly 60k messages, enough for bursts on a busy node.
+BPF_RINGBUF_OUTPUT(messages, 2048);
 
-int trace_inbound_message(struct pt_regs *ctx) {
-    struct p2p_message msg = {};
+// Number of messages dropped because the ring buffer was full.
+BPF_ARRAY(dropped, u64, 1);
 
-    bpf_usdt_readarg(1, ctx, &msg.peer_id);
-    bpf_usdt_readarg_p(2, ctx, &msg.peer_addr, MAX_PEER_ADDR_LENGTH);
-    bpf_usdt_readarg_p(3, ctx, &msg.peer_conn_type, MAX_PEER_CONN_TYPE_LENGTH);
-    bpf_usdt_readarg_p(4, ctx, &msg.msg_type, MAX_MSG_TYPE_LENGTH);
-    bpf_usdt_readarg(5, ctx, &msg.msg_size);
+static __always_inline void count_dropped() {
+    int zero = 0;
+    u64 *count = dropped.lookup(&zero);
+    if (count)
+        __sync_fetch_and_add(count, 1);
+}
 
-    inbound_messages.perf_submit(ctx, &msg, sizeof(msg));
+// User space drains the ring buffer on a timer without waiting on it, so
+// messages are submitted with BPF_RB_NO_WAKEUP: notifying a reader that isn't
+// waiting would only add overhead to every message.
+
+int trace_inbound_message(struct pt_regs *ctx) {
+    // reserve the message in the ring buffer and fill it in place, which
+    // avoids copying it from the stack
+    struct p2p_message *msg = messages.ringbuf_reserve(sizeof(struct p2p_message));
+    if (!msg) {
+        count_dropped();
+        return 0;
+    }
+
+    msg->flow = FLOW_INBOUND;
+    bpf_usdt_readarg(1, ctx, &msg->peer_id);
+    bpf_usdt_readarg_p(2, ctx, &msg->peer_addr, MAX_PEER_ADDR_LENGTH);
+    bpf_usdt_readarg_p(3, ctx, &msg->peer_conn_type, MAX_PEER_CONN_TYPE_LENGTH);
+    bpf_usdt_readarg_p(4, ctx, &msg->msg_type, MAX_MSG_TYPE_LENGTH);
+    bpf_usdt_readarg(5, ctx, &msg->msg_size);
+
+    messages.ringbuf_submit(msg, BPF_RB_NO_WAKEUP);
     return 0;
 };
 
 int trace_outbound_message(struct pt_regs *ctx) {
-    struct p2p_message msg = {};
-
-    bpf_usdt_readarg(1, ctx, &msg.peer_id);
-    bpf_usdt_readarg_p(2, ctx, &msg.peer_addr, MAX_PEER_ADDR_LENGTH);
-    bpf_usdt_readarg_p(3, ctx, &msg.peer_conn_type, MAX_PEER_CONN_TYPE_LENGTH);
-    bpf_usdt_readarg_p(4, ctx, &msg.msg_type, MAX_MSG_TYPE_LENGTH);
-    bpf_usdt_readarg(5, ctx, &msg.msg_size);
-
-    outbound_messages.perf_submit(ctx, &msg, sizeof(msg));
+    struct p2p_message *msg = messages.ringbuf_reserve(sizeof(struct p2p_message));
+    if (!msg) {
+        count_dropped();
+        return 0;
+    }
+
+    msg->flow = FLOW_OUTBOUND;
+    bpf_usdt_readarg(1, ctx, &msg->peer_id);
+    bpf_usdt_readarg_p(2, ctx, &msg->peer_addr, MAX_PEER_ADDR_LENGTH);
+    bpf_usdt_readarg_p(3, ctx, &msg->peer_conn_type, MAX_PEER_CONN_TYPE_LENGTH);
+    bpf_usdt_readarg_p(4, ctx, &msg->msg_type, MAX_MSG_TYPE_LENGTH);
+    bpf_usdt_readarg(5, ctx, &msg->msg_size);
+
+    messages.ringbuf_submit(msg, BPF_RB_NO_WAKEUP);
     return 0;
 };
 """
 
 
-# TODO: This is taken from ../rpc/base.py; at some point, extract this
-# functionality to avoid duplication
-def human_readable_size(size_bytes: int) -> str:
-    """Convert size in bytes to a human-readable string."""
-    if size_bytes < 1000:
-        return f"{size_bytes}B"
-    if (size_kbytes := size_bytes / 1000) < 1000:
-        return f"{size_kbytes:.1f}kB"
-    return f"{(size_kbytes/1000):.1f}MB"
-
-
-# TODO: This is taken from ../rpc/base.py; at some point, extract this
-# functionality to avoid duplication
-def human_readable_time(sec: float) -> str:
-    """Convert seconds to a human-readable string."""
-    if (msec := int(sec * 1000)) < 1000:
-        return f"{msec}ms"
-    if sec < 60:
-        return f"{sec:.1f}s"
-    if (min_ := sec / 60) < 60:
-        return f"{min_:.1f}m"
-    return f"{(min_/60):.1f}h"
-
-
 @dataclass
-class Net:
+class Net(DailyCSVSource):
     """
-    Class implementing the collection of IP accounting statistics for the
-    bitcoind service via systemd.
+    Class implementing the collection of bitcoind's in- and outbound P2P
+    messages via its net:inbound_message and net:outbound_message tracepoints.
     """
 
-    results_path: Path
-    peers = {}
-    messages = []
+    RESULTS_DIR: ClassVar[str] = "tracepoints"
     FREQUENCY: ClassVar[int] = 5  # 5 seconds
     CALL_NAME: ClassVar[str] = "net"
-    # TODO: not used here, probably should be. need to figure out field names
     CSV_FIELDS: ClassVar[list[str]] = [
         "peer_id",
         "peer_conn_type",
@@ -122,50 +126,62 @@ class Net:
         "msg_type",
         "size",
     ]
-
-    # TODO: This is taken from ../rpc/base.py; at some point, extract this
-    # functionality to avoid duplication
-    @cached_property
-    def log(self):
-        """Custom logger."""
-        return log.getLogger(self.__class__.__name__)
+    # header line, ready to be written to the (binary) CSV file
+    CSV_HEADER: ClassVar[bytes] = (
+        ",".join(["timestamp"] + CSV_FIELDS).encode() + b"\r\n"
+    )
+    _pid: int | None = field(default=None, init=False, repr=False)
+    # messages received since the last poll, as tuples in CSV_FIELDS order; the
+    # strings are kept as the raw bytes received from the BPF program. It is
+    # only filled while draining the ring buffer, which bounds its size, and is
+    # emptied in the same poll
+    messages: deque | None = field(default=None, init=False, repr=False)
 
     async def get_pid(self, binary_name="bitcoind") -> int:
-        """Get the PID of the bitcoind process."""
-        pids = []
-        for process in psutil.process_iter(["name", "pid"]):
-            if process.info["name"] == binary_name:
-                pids.append(process.info["pid"])
-        if len(pids) != 1:
-            raise RuntimeError(
-                f"get_pid: found {len(pids)} processes with name {binary_name}"
+        """Get the PID of the bitcoind process.
+
+        The PID is cached and only looked up again once the process is gone.
+        Until exactly one matching process is running (e.g. while bitcoind is
+        restarting), the lookup is retried every FREQUENCY seconds.
+        """
+        if self._pid is not None and os.path.exists(f"/proc/{self._pid}"):
+            return self._pid
+
+        while True:
+            pids = []
+            for pid in os.listdir("/proc"):
+                if not pid.isdigit():
+                    continue
+                try:
+                    with open(f"/proc/{pid}/comm", encoding="UTF-8") as f:
+                        name = f.read().strip()
+                except (FileNotFoundError, ProcessLookupError):
+                    continue  # process exited in the meantime
+                if name == binary_name:
+                    pids.append(int(pid))
+            if len(pids) == 1:
+                break
+            self.log.warning(
+                "found %d processes with name %s, retrying in %ds",
+                len(pids),
+                binary_name,
+                self.FREQUENCY,
             )
-        return pids[0]
-
-    # TODO: This is taken from ../rpc/base.py; at some point, extract this
-    # functionality to avoid duplication
-    async def reschedule(self):
-        """Reschedule the task by sleeping until the next multiple of FREQUENCY."""
-        now = time.time() + 1  # avoid race condition where now % FREQUENCY == 0
-        last_scheduled = now - now % self.FREQUENCY
-        next_scheduled = last_scheduled + self.FREQUENCY
-        wake_time = datetime.datetime.utcfromtimestamp(next_scheduled)
-        sleep_time = next_scheduled - now
-        self.log.info(
-            "Scheduling next run at %s (sleeping for %s)",
-            wake_time.isoformat() + "Z",
-            human_readable_time(sleep_time),
-        )
-        await asyncio.sleep(sleep_time)
-        self.log.info("tracepoints.net:run(): Waking up")
+            await asyncio.sleep(self.FREQUENCY)
+        self._pid = pids[0]
+        return self._pid
 
-    async def run(self):
-        """Code to fetch data from systemd."""
+    def attach(self, pid: int) -> BPF:
+        """Compile the BPF program and attach it to the tracepoints of the
+        bitcoind process with the given PID.
 
-        self.log.info("tracepoints.net:run() started")
+        The program is compiled for every attach: the USDT context it is built
+        with is bound to a single PID, so there is nothing to reuse once
+        bitcoind has been restarted.
+        """
         self.log.info("tracepoints.net:run() enabling probes...")
 
-        bitcoind_with_usdts = USDT(pid=await self.get_pid())
+        bitcoind_with_usdts = USDT(pid=pid)
         # attaching the trace functions defined in the BPF program to the tracepoints
         bitcoind_with_usdts.enable_probe(
             probe="net:inbound_message", fn_name="trace_inbound_message"
@@ -177,85 +193,117 @@ class Net:
         self.log.info("tracepoints.net:run() compiling program...")
         bpf = BPF(text=PROGRAM, usdt_contexts=[bitcoind_with_usdts])
 
-        # def handle_message(direction, data, size):
-        #     event = bpf["
+        messages = self.messages = deque()
 
-        # BCC: perf buffer handle function for inbound_messages
-        #
-        def handle_message(event, flow: str) -> None:
+        # BCC: ring buffer handle function for in- and outbound messages
+        def handle_message(_, data, size):
             """Handle in- and outbound messages."""
-            message = Message(
-                peer_id=event.peer_id,
-                peer_conn_type=event.peer_conn_type.decode("utf-8"),
-                peer_addr=event.peer_addr.decode("utf-8"),
-                flow=flow,
-                msg_type=event.msg_type.decode("utf-8"),
-                size=event.msg_size,
+            event = bpf["messages"].event(data)
+            messages.append(
+                (
+                    event.peer_id,
+                    event.peer_conn_type,
+                    event.peer_addr,
+                    FLOWS[event.flow],
+                    event.msg_type,
+                    event.msg_size,
+                )
             )
-            self.messages.append(message)
 
-        def handle_inbound(_, data, size):
-            """Inbound message handler."""
-            event = bpf["inbound_messages"].event(data)
-            handle_message(event, flow="in")
+        self.log.info("tracepoints.net:run() adding handlers...")
 
-        def handle_outbound(_, data, size):
-            """Outbound message handler."""
-            event = bpf["outbound_messages"].event(data)
-            handle_message(event, flow="out")
+        # BCC: add handler to the ring buffer
+        bpf["messages"].open_ring_buffer(handle_message)
 
-        self.log.info("tracepoints.net:run() adding handlers...")
+        return bpf
 
-        # BCC: add handlers to the inbound and outbound perf buffers
-        # be generous with the page_cnt (default=8) to increase the buffer size
-        bpf["inbound_messages"].open_perf_buffer(handle_inbound, page_cnt=128)
-        bpf["outbound_messages"].open_perf_buffer(handle_outbound, page_cnt=128)
+    async def run(self):
+        """Code to fetch data from bitcoind's tracepoints.
 
-        tz = datetime.timezone.utc
-        while True:
-            call_time = datetime.datetime.now(tz).strftime("%Y-%m-%dT%H:%M:%SZ")
-            try:
-                call_result = await self.tracepoint_poll(bpf)
-                data = self.format_results(call_time, call_result)
-                if data:
-                    self.write_result(data)
-                else:
-                    self.log.warning("no data returned by format_results")
-            except ConnectionError as e:
-                self.log.error(e)
-            await self.reschedule()
-
-    async def tracepoint_poll(self, bpf) -> list[dict]:
-        """Tracepoint call."""
-        bpf.perf_buffer_poll(timeout=50)
+        Returns once bitcoind exits, so that the probes are attached to the new
+        bitcoind process when run again.
+        """
+
+        self.log.info("tracepoints.net:run() started")
+        pid = await self.get_pid()
+        bpf = self.attach(pid)
+
+        try:
+            while True:
+                call_time = utc_timestamp()
+                try:
+                    data = await self.tracepoint_poll(bpf)
+                    if data:
+                        await self.write_in_thread(call_time, data)
+                    else:
+                        self.log.warning("no messages received")
+                except ConnectionError as e:
+                    self.log.error(e)
+                # checked after polling, so messages sent before bitcoind
+                # exited are still written
+                if not os.path.exists(f"/proc/{pid}"):
+                    self.log.warning("bitcoind (pid %d) exited", pid)
+                    return
+                await self.reschedule()
+        finally:
+            bpf.cleanup()
+            await self.close_after_write()
+
+    async def tracepoint_poll(self, bpf) -> list[tuple]:
+        """Tracepoint call: drain all messages received since the last call.
+
+        Messages are returned as rows in CSV_FIELDS order, ready to be written.
+        """
+        # consume everything in the ring buffer in one pass without waiting for
+        # (or being woken up by) new events
+        bpf.ring_buffer_consume()
+        dropped = bpf["dropped"]
+        if num_dropped := dropped[0].value:
+            dropped.clear()
+            self.log.warning("ring buffer full, dropped %d messages", num_dropped)
         num_msgs = len(self.messages)
         self.log.info("tracepoints.net:run() received %d new messages...", num_msgs)
-        results = [asdict(msg) for msg in self.messages]
-        self.messages.clear()
-        return results
-
-    def format_results(self, timestamp, data) -> list[dict]:
-        """Format list of results: add timestamp to each."""
-        results = []
-        for msg in data:
-            result = {"timestamp": timestamp}
-            result.update({key: msg[key] for key in self.CSV_FIELDS if key in msg})
-            results.append(result)
-        return results
-
-    def write_result(self, data):
+        messages = self.messages
+        return [messages.popleft() for _ in range(num_msgs)]
+
+    def open_csv(self, file: Path) -> BinaryIO:
+        """Open file for appending (in binary mode), writing the header if new."""
+        f = open(file, "ab", buffering=1 << 17)
+        if f.tell() == 0:  # new (or empty) file
+            f.write(self.CSV_HEADER)
+        return f
+
+    def write_result(self, timestamp, data):
         """Write CSV call results to CSV file.
 
-        :param list data: a list of dicts containing data to be written
-        """
+        Rows are buffered and flushed once at the end of each call, so a busy
+        interval results in a few large writes rather than one per row.
 
-        date = data[0]["timestamp"].split("T")[0]
-        file = Path(f"{self.results_path}/tracepoints/{self.CALL_NAME}/{date}.csv")
+        Rows are formatted straight from the bytes received from the BPF
+        program. Peer addresses, connection and message types normally contain
+        no characters that need quoting; rows that do are passed to the csv
+        module instead.
+
+        :param str timestamp: the call time, prepended to every row
+        :param list data: a list of tuples containing data to be written
+        """
 
-        file_exists = file.exists()
-        file.parent.mkdir(parents=True, exist_ok=True)
-        with open(file, "a", newline="", encoding="UTF-8") as f:
-            csv_writer = csv.DictWriter(f, fieldnames=["timestamp"] + self.CSV_FIELDS)
-            if not file_exists:
-                csv_writer.writeheader()
-            csv_writer.writerows(data)
+        csv_file = self.csv_file(timestamp[:10])  # YYYY-MM-DD
+        timestamp = timestamp.encode()
+        write = csv_file.write
+        for row in data:
+            line = ROW_FORMAT % (timestamp, *row)
+            if line.count(b",") != 6 or NEEDS_QUOTING.search(line, 0, len(line) - 2):
+                line = csv_row((timestamp, *row))
+            write(line)
+        csv_file.flush()
+
+
+def csv_row(row) -> bytes:
+    """Format a row (of strings, bytes, or numbers) with the csv module."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(
+        value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+        for value in row
+    )
+    return buffer.getvalue().encode("utf-8")
@@ -1,14 +1,21 @@
 """This module contains the configuration options."""
 
 import argparse
+import functools
 import importlib.metadata
-from dataclasses import asdict, dataclass
+import logging as log
+import sys
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 
-__version__ = importlib.metadata.version(__package__ or __name__)
 
+@functools.cache
+def _get_version() -> str:
+    """Get the installed package's version (looked up on first use only)."""
+    return importlib.metadata.version(__package__ or __name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class RPCConfig:
     """Configuration settings for Bitcoin Core's RPC interface."""
 
@@ -16,16 +23,18 @@ class RPCConfig:
     port: int
     user: str
     password: str
+    unix_socket: Path | None = None
 
     @classmethod
     def parse(cls, args):
         """Create class instance from command-line arguments."""
 
         return cls(
-            host=args.rpc_host,
+            host=sys.intern(args.rpc_host),
             port=args.rpc_port,
-            user=args.rpc_user,
+            user=sys.intern(args.rpc_user),
             password=cls.get_password(args.rpc_password, args.rpc_password_file),
+            unix_socket=args.rpc_unix_socket,
         )
 
     @staticmethod
@@ -40,21 +49,36 @@ class RPCConfig:
         if password:
             return password
 
-        if not password_file.exists():
-            raise FileNotFoundError(f"Password file {password_file} does not exist")
+        try:
+            text = password_file.read_text(encoding="utf-8")
+        except FileNotFoundError as e:
+            raise FileNotFoundError(
+                f"Password file {password_file} does not exist"
+            ) from e
 
-        print(f"Using RPC password from {password_file}.")
-        with open(password_file, "r", encoding="utf-8") as f:
-            password = f.readline().strip("\n")
+        log.info("Using RPC password from %s", password_file)
+        # the password is the file's first line
+        return text.partition("\n")[0]
 
-        return password
+    def to_dict(self):
+        """Convert to dictionary."""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "user": self.user,
+            "password": self.password,
+            "unix_socket": str(self.unix_socket) if self.unix_socket else None,
+        }
 
     def __repr__(self):
         """Return redacted string."""
-        return f"RPCConfig(host={self.host}, port={self.port}, user={self.user}, password=<redacted>)"
+        return (
+            f"RPCConfig(host={self.host}, port={self.port}, user={self.user}, "
+            f"password=<redacted>, unix_socket={self.unix_socket})"
+        )
 
 
-@dataclass
+@dataclass(slots=True)
 class SourcesConfig:
     """Configuration settings for data sources."""
 
@@ -65,6 +89,14 @@ class SourcesConfig:
     rpc_getrawaddrman: bool
     systemd_ipaccounting: bool
     tracepoints_net: bool
+    # names of the enabled sources (in declaration order)
+    active: tuple[str, ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        """Collect the names of the enabled sources."""
+        self.active = tuple(
+            f.name for f in fields(self) if f.init and getattr(self, f.name)
+        )
 
     @classmethod
     def parse(cls, args):
@@ -79,8 +111,20 @@ class SourcesConfig:
             tracepoints_net=args.record_tracepoints_net,
         )
 
-
-@dataclass
+    def to_dict(self):
+        """Convert to dictionary."""
+        return {
+            "rpc_getconnectioncount": self.rpc_getconnectioncount,
+            "rpc_getpeerinfo": self.rpc_getpeerinfo,
+            "rpc_gettxoutsetinfo": self.rpc_gettxoutsetinfo,
+            "rpc_getnodeaddresses": self.rpc_getnodeaddresses,
+            "rpc_getrawaddrman": self.rpc_getrawaddrman,
+            "systemd_ipaccounting": self.systemd_ipaccounting,
+            "tracepoints_net": self.tracepoints_net,
+        }
+
+
+@dataclass(slots=True)
 class Config:
     """Configuration settings."""
 
@@ -98,26 +142,39 @@ class Config:
         args.result_path.mkdir(parents=True, exist_ok=True)
 
         return cls(
-            version=__version__,
-            log_level=args.log_level.upper(),
-            results_path=Path(args.result_path),
+            version=_get_version(),
+            log_level=args.log_level,
+            results_path=args.result_path,
             rpc_conf=RPCConfig.parse(args),
             sources=SourcesConfig.parse(args),
         )
 
     def to_dict(self):
         """Convert to dictionary."""
-        return asdict(self)
+        return {
+            "version": self.version,
+            "log_level": self.log_level,
+            "results_path": str(self.results_path),
+            "rpc_conf": self.rpc_conf.to_dict(),
+            "sources": self.sources.to_dict(),
+        }
 
 
-def parse_args():
-    """Parse command-line arguments."""
+def parse_args(argv=None):
+    """Parse command-line arguments (from sys.argv unless argv is given)."""
+    return _build_parser().parse_args(argv)
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser (once, it is reused afterwards)."""
 
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
         "--log-level",
-        type=str,
+        type=str.upper,
+        choices=("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"),
         default="INFO",
         help="Logging verbosity",
     )
@@ -163,6 +220,13 @@ def parse_args():
         help="File containing Bitcoin Core RPC password",
     )
 
+    parser.add_argument(
+        "--rpc-unix-socket",
+        type=Path,
+        default=None,
+        help="Connect to Bitcoin Core RPC via this UNIX socket instead of TCP",
+    )
+
     parser.add_argument(
         "--record-rpc-getconnectioncount",
         action=argparse.BooleanOptionalAction,
@@ -212,5 +276,4 @@ def parse_args():
         help="Record P2P network traffic (via tracepoints)",
     )
 
-    args = parser.parse_args()
-    return args
+    return parser
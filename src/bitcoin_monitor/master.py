@@ -8,6 +8,21 @@ from functools import cached_property
 from .bitcoin import rpc, systemd, tracepoints
 from .config import Config
 
+logger = log.getLogger("Master")
+
+# data sources by SourcesConfig flag: source class and group. RPC sources are
+# driven by a shared RPC scheduler, local sources (systemd, tracepoints) run
+# on their own
+_SOURCE_SPECS = {
+    "rpc_getconnectioncount": (rpc.GetConnectionCount, "rpc"),
+    "rpc_getpeerinfo": (rpc.GetPeerInfo, "rpc"),
+    "rpc_gettxoutsetinfo": (rpc.GetTxoutSetInfo, "rpc"),
+    "rpc_getnodeaddresses": (rpc.GetNodeAddresses, "rpc"),
+    "rpc_getrawaddrman": (rpc.GetRawAddrman, "rpc"),
+    "systemd_ipaccounting": (systemd.IPAccounting, "local"),
+    "tracepoints_net": (tracepoints.Net, "local"),
+}
+
 
 @dataclass
 class Master:
@@ -16,50 +31,60 @@ class Master:
     conf: Config
 
     @cached_property
-    def log(self):
-        """Custom logger."""
-        return log.getLogger(self.__class__.__name__)
+    def rpc_client(self) -> rpc.RPCClient:
+        """Connection pool shared by all RPC sources."""
+        return rpc.RPCClient(self.conf.rpc_conf)
 
     async def prepare_sources(self) -> list:
         """Prepare data sources per configuration set via command-line arguments."""
-        sources = []
+        results_path = self.conf.results_path
+        args = {
+            "rpc": (self.rpc_client, results_path),
+            "local": (results_path,),
+        }
+        groups = {"rpc": [], "local": []}
+        for flag in self.conf.sources.active:
+            source_cls, group = _SOURCE_SPECS[flag]
+            groups[group].append(source_cls(*args[group]))
+        rpc_sources, sources = groups["rpc"], groups["local"]
 
-        # RPC sources
-        args = (self.conf.rpc_conf, self.conf.results_path)
-        if self.conf.sources.rpc_getconnectioncount:
-            sources.append(rpc.GetConnectionCount(*args))
-        if self.conf.sources.rpc_getpeerinfo:
-            sources.append(rpc.GetPeerInfo(*args))
-        if self.conf.sources.rpc_gettxoutsetinfo:
-            sources.append(rpc.GetTxoutSetInfo(*args))
-        if self.conf.sources.rpc_getnodeaddresses:
-            sources.append(rpc.GetNodeAddresses(*args))
-        if self.conf.sources.rpc_getrawaddrman:
-            sources.append(rpc.GetRawAddrman(*args))
+        if logger.isEnabledFor(log.INFO):
+            logger.info(
+                "Active sources: %s",
+                ", ".join(src.__class__.__name__ for src in rpc_sources + sources),
+            )
 
-        # tracepoint sources
-        args = (self.conf.results_path,)
-        if self.conf.sources.tracepoints_net:
-            sources.append(tracepoints.Net(*args))
+        # all RPC sources are driven by a single scheduler
+        if rpc_sources:
+            sources.append(rpc.RPCScheduler(self.rpc_client, rpc_sources))
+        return sources
 
-        # systemd sources
-        args = (self.conf.results_path,)
-        if self.conf.sources.systemd_ipaccounting:
-            sources.append(systemd.IPAccounting(*args))
+    async def supervise(self, source):
+        """Run a data source, restarting it five seconds after it returns.
 
-        log.info("Active sources: %s", [src.__class__.__name__ for src in sources])
-        return sources
+        A source failing with an exception is logged and restarted as well, so
+        it cannot take the other sources down with it.
+        """
+        name = source.__class__.__name__
+        while True:
+            logger.info("%s started", name)
+            try:
+                await source.run()
+                logger.info("%s returned, sleeping for five", name)
+            except Exception:
+                logger.exception("%s failed, sleeping for five", name)
+            await asyncio.sleep(5)
 
     async def run(self):
         """Entry point for the master/control thread."""
 
-        while True:
-            self.log.info("thread started")
-
-            sources = await self.prepare_sources()
-            await asyncio.gather(
-                *[sensor.run() for sensor in sources],
-            )
-            self.log.info("sleeping for five")
-            await asyncio.sleep(5)
-            self.log.info("waking up")
+        logger.info("thread started")
+        # the configuration doesn't change at runtime, so neither do the sources;
+        # they are set up once, and each one is restarted independently whenever
+        # it returns (the RPC scheduler once all its sources have stopped, net
+        # tracing when bitcoind exits) without waiting for the others
+        sources = await self.prepare_sources()
+        try:
+            await asyncio.gather(*(self.supervise(source) for source in sources))
+        finally:
+            await self.rpc_client.close()
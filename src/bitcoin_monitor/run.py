@@ -13,25 +13,30 @@ from .master import Master
 def init_logger(log_level: str):
     """Initilize the logger. Use UTC-based timestamps and log to file if requested."""
 
-    log.basicConfig(
-        format="%(asctime)s | %(levelname)-8s | %(name)s: %(message)s",
+    formatter = log.Formatter(
+        fmt="%(asctime)s | %(levelname)-8s | %(name)s: %(message)s",
         datefmt="%Y-%m-%dT%H:%M:%SZ",
-        level=log_level,
     )
-    log.Formatter.converter = time.gmtime
+    formatter.converter = time.gmtime
+    handler = log.StreamHandler()
+    handler.setFormatter(formatter)
+
+    root = log.getLogger()
+    root.addHandler(handler)
+    root.setLevel(log_level)
 
 
 def init():
     """
     Handle initialization.
 
-    First, parse command-line arguments and create Config object, then
-    initialize the logger.
+    First, parse command-line arguments and initialize the logger, then create
+    Config object (so that messages logged while doing so are not lost).
     """
 
     args = parse_args()
+    init_logger(args.log_level)
     conf = Config.parse(args)
-    init_logger(conf.log_level)
     log.info("Run config: %s", conf)
     return conf
 
@@ -0,0 +1,28 @@
+"""This module contains helper functions shared by all data sources."""
+
+import time
+
+
+def human_readable_size(size_bytes: int) -> str:
+    """Convert size in bytes to a human-readable string."""
+    if size_bytes < 1000:
+        return f"{size_bytes}B"
+    if (size_kbytes := size_bytes / 1000) < 1000:
+        return f"{size_kbytes:.1f}kB"
+    return f"{(size_kbytes/1000):.1f}MB"
+
+
+def human_readable_time(sec: float) -> str:
+    """Convert seconds to a human-readable string."""
+    if (msec := int(sec * 1000)) < 1000:
+        return f"{msec}ms"
+    if sec < 60:
+        return f"{sec:.1f}s"
+    if (min_ := sec / 60) < 60:
+        return f"{min_:.1f}m"
+    return f"{(min_/60):.1f}h"
+
+
+def utc_timestamp() -> str:
+    """Current UTC time as ISO 8601 string with second precision."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())